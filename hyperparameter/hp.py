@@ -1,7 +1,9 @@
 import inspect
 import json
+import re
 import threading
 
+from functools import lru_cache
 from typing import Any, Dict
 from typing import Callable
 
@@ -9,7 +11,10 @@ from typing import Callable
 class Tracker:
     """
     tracker for python read/write operations
+
+    set `Tracker.enabled = False` to skip the bookkeeping on every parameter access
     """
+    enabled = True
     rlist = set()
 
     wlist = set()
@@ -17,21 +22,15 @@ class Tracker:
 
     @staticmethod
     def reads():
-        retval = list(Tracker.rlist)
-        retval.sort()
-        return retval
+        return sorted(Tracker.rlist)
 
     @staticmethod
     def writes():
-        retval = list(Tracker.wlist)
-        retval.sort()
-        return retval
+        return sorted(Tracker.wlist)
 
     @staticmethod
     def all():
-        retval = list(Tracker.rlist.union(Tracker.wlist))
-        retval.sort()
-        return retval
+        return sorted(Tracker.rlist.union(Tracker.wlist))
 
     @staticmethod
     def report():
@@ -69,8 +68,9 @@ class Accessor(dict):
     >>> print(params)
     {'undefined_object': {'undefined_prop': 1}}
     """
+    __slots__ = ('_root', '_path', '__weakref__')
 
-    def __init__(self, root, path=None):
+    def __init__(self, root, path=()):
         self._root = root
         self._path = path
 
@@ -78,28 +78,30 @@ class Accessor(dict):
         """
         get value for the parameter, or get default value if parameter is not defined.
         """
-        Tracker.rlist.add(self._path)
-        value = self._root.get(self._path)
+        name = '.'.join(self._path)
+        if Tracker.enabled:
+            Tracker.rlist.add(name)
+        value = self._root.get(name)
         return default if value is None else value
 
     def __getattr__(self, name: str) -> Any:
-        if name in ['_path', '_root']:
-            return self[name]
-
-        if self._path:
-            name = '{}.{}'.format(self._path, name)
-        return Accessor(self._root, name)
+        if name in {'_path', '_root'} or (name.startswith('__')
+                                          and name.endswith('__')):
+            raise AttributeError(name)
+        return Accessor(self._root, self._path + (name, ))
 
     def __setattr__(self, name: str, value: Any):
-        if name in ['_path', '_root']:
-            return self.__setitem__(name, value)
-        full_name = '{}.{}'.format(self._path,
-                                   name) if self._path is not None else name
-        Tracker.wlist.add(full_name)
+        if name in {'_path', '_root'}:
+            return dict.__setattr__(self, name, value)
+        if Tracker.enabled:
+            Tracker.wlist.add('.'.join(self._path + (name, )))
         root = self._root
-        for path in self._path.split('.'):
-            root[path] = HyperParameter()
-            root = root[path]
+        for path in self._path:
+            child = dict.get(root, path)
+            if not isinstance(child, dict):
+                child = HyperParameter()
+                dict.__setitem__(root, path, child)
+            root = child
         root[name] = value
         return value
 
@@ -154,6 +156,7 @@ class HyperParameter(dict):
     >>> hp = HyperParameter()
     >>> hp.put('a.b.c', 1)
     '''
+    __slots__ = ('__weakref__', )
 
     def __init__(self, **kws):
         super(HyperParameter, self).__init__()
@@ -162,13 +165,25 @@ class HyperParameter(dict):
     def update(self, kws):
         for k, v in kws.items():
             if isinstance(v, dict):
-                if k in self and isinstance(self[k], dict):
-                    vv = HyperParameter(**self[k])
-                    vv.update(v)
-                    v = vv
-                else:
-                    v = HyperParameter(**v)
-            self[k] = v
+                vv = HyperParameter()
+                old = dict.get(self, k)
+                if isinstance(old, dict):
+                    vv._copy_from(old)
+                vv.update(v)
+                v = vv
+            dict.__setitem__(self, k, v)
+
+    def _copy_from(self, kws):
+        """
+        deep copy `kws` into this parameter, nested dicts are copied so that
+        writes to this parameter never leak into `kws`.
+        """
+        for k, v in kws.items():
+            if isinstance(v, dict):
+                vv = HyperParameter()
+                vv._copy_from(v)
+                v = vv
+            dict.__setitem__(self, k, v)
 
     def put(self, name: str, value: Any):
         """
@@ -188,14 +203,22 @@ class HyperParameter(dict):
         >>> cfg.obj1.propA
         'A'
         """
-        path = name.split('.')
+        if isinstance(value, str):
+            value = safe_numeric(value)
+        self._put(name, value)
+
+    def _put(self, name: str, value: Any):
+        path = _split_path(name)
         obj = self
         for p in path[:-1]:
-            if p not in obj or (not isinstance(obj[p], dict)):
-                obj[p] = HyperParameter()
-            obj = obj[p]
-        Tracker.wlist.add(name)
-        obj[path[-1]] = safe_numeric(value)
+            child = dict.get(obj, p)
+            if not isinstance(child, dict):
+                child = HyperParameter()
+                dict.__setitem__(obj, p, child)
+            obj = child
+        if Tracker.enabled:
+            Tracker.wlist.add(name)
+        obj[path[-1]] = value
 
     def get(self, name: str) -> Any:
         """
@@ -214,18 +237,25 @@ class HyperParameter(dict):
         >>> cfg.get('b.c')
         2
         """
-        path = name.split('.')
+        if '.' not in name:
+            if Tracker.enabled:
+                Tracker.rlist.add(name)
+            return dict.get(self, name)
+        path = _split_path(name)
         obj = self
         for p in path[:-1]:
             if p not in obj:
                 return None
             obj = obj[p]
-        Tracker.rlist.add(name)
+        if Tracker.enabled:
+            Tracker.rlist.add(name)
         return obj[path[-1]] if path[-1] in obj else None
 
     def __setitem__(self, key, value):
         if isinstance(value, dict):
-            return dict.__setitem__(self, key, HyperParameter(**value))
+            vv = HyperParameter()
+            vv._copy_from(value)
+            value = vv
         return dict.__setitem__(self, key, value)
 
     def __getattr__(self, name):
@@ -234,10 +264,7 @@ class HyperParameter(dict):
         """
         if name in self.keys():
             return self[name]
-        else:
-            if name in self.__dict__.keys():
-                return self.__dict__[name]
-            return Accessor(self, name)
+        return Accessor(self, (name, ))
 
     def __setattr__(self, name, value):
         """
@@ -264,7 +291,7 @@ class HyperParameter(dict):
         2
         """
 
-        return Accessor(self, None)
+        return Accessor(self)
 
     @staticmethod
     def from_json(s):
@@ -278,6 +305,15 @@ class HyperParameter(dict):
             return HyperParameter(**obj)
 
 
+class _ScopeStack(threading.local):
+    """
+    per-thread stack of entered param_scopes, created empty for every thread
+    """
+
+    def __init__(self):
+        self._cfg_ = []
+
+
 class param_scope(HyperParameter):
     '''
     thread safe scoped hyper parameeter
@@ -303,24 +339,34 @@ class param_scope(HyperParameter):
     ...         newcfg.b
     2
     3
+
+    parameters can also be given as define strings or pre-parsed tuples,
+    values in tuples are used as is
+    >>> with param_scope('a.b=1', ('a.c', '2')) as cfg:
+    ...     cfg.a.b, cfg.a.c
+    (1, '2')
     '''
-    tls = threading.local()
+    __slots__ = ()
+    tls = _ScopeStack()
 
     def __init__(self, *args, **kws):
-        if hasattr(param_scope.tls,
-                   '_cfg_') and len(param_scope.tls._cfg_) > 0:
-            self.update(param_scope.tls._cfg_[-1])
+        stack = param_scope.tls._cfg_
+        if stack:
+            self._copy_from(stack[-1])
         self.update(kws)
         for newcfg in args:
-            if '=' in newcfg:
-                k, v = newcfg.split('=', 1)
-                self.put(k, v)
+            if isinstance(newcfg, tuple):
+                define = newcfg
+            elif isinstance(newcfg, str):
+                define = _parse_define(newcfg)
+            else:
+                continue
+            if define is not None:
+                self._put(*define)
 
     def __enter__(self):
-        if not hasattr(param_scope.tls, '_cfg_'):
-            param_scope.tls._cfg_ = []
         param_scope.tls._cfg_.append(self)
-        return param_scope.tls._cfg_[-1]
+        return self
 
     def __exit__(self, exc_type, exc_value, traceback):
         param_scope.tls._cfg_.pop()
@@ -330,9 +376,9 @@ class param_scope(HyperParameter):
         """
         init param_scope for a new thread.
         """
-        if not hasattr(param_scope.tls, '_cfg_'):
-            param_scope.tls._cfg_ = []
-            param_scope.tls._cfg_.append(params)
+        stack = param_scope.tls._cfg_
+        if not stack:
+            stack.append(params)
 
 
 def auto_param(func):
@@ -352,8 +398,7 @@ def auto_param(func):
     ...     foo(2)
     2 3 c None
     """
-    predef_kws = {}
-    predef_val = {}
+    predef_args = []
 
     namespace = func.__module__
     if namespace == '__main__':
@@ -367,19 +412,21 @@ def auto_param(func):
     for k, v in signature.parameters.items():
         if v.default != v.empty:
             name = '{}.{}'.format(namespace, k)
-            predef_kws[k] = name
-            Tracker.rlist.add(name)
-            predef_val[name] = v.default
+            if Tracker.enabled:
+                Tracker.rlist.add(name)
+            predef_args.append((k, name, v.default))
+    predef_args = tuple(predef_args)
 
     def wrapper(*arg, **kws):
         with param_scope() as hp:
             local_params = {}
-            for k, v in predef_kws.items():
-                if hp.get(v) is not None and k not in kws:
-                    kws[k] = hp.get(v)
-                    local_params[v] = hp.get(v)
+            for k, name, default in predef_args:
+                value = hp.get(name)
+                if value is not None and k not in kws:
+                    kws[k] = value
+                    local_params[name] = value
                 else:
-                    local_params[v] = predef_val[v]
+                    local_params[name] = default
             if Tracker.callback is not None:
                 Tracker.callback(local_params)
             return func(*arg, **kws)
@@ -387,16 +434,54 @@ def auto_param(func):
     return wrapper
 
 
+@lru_cache(maxsize=1024)
+def _split_path(name: str):
+    return tuple(name.split('.'))
+
+
+@lru_cache(maxsize=1024)
+def _parse_define(define: str):
+    """
+    parse a `name=value` define string, the result is cached since the same
+    defines are usually passed to param_scope over and over again.
+
+    Examples:
+    >>> _parse_define('a.b=1')
+    ('a.b', 1)
+    >>> _parse_define('a.b') is None
+    True
+    """
+    if '=' not in define:
+        return None
+    k, v = define.split('=', 1)
+    return k, safe_numeric(v)
+
+
+_INT_PATTERN = re.compile(r'\s*[-+]?\d+(?:_\d+)*\s*')
+_FLOAT_PREFIX = re.compile(r'\s*[-+]?(?:\d|\.\d|inf|nan)', re.IGNORECASE)
+
+
 def safe_numeric(value):
+    """
+    convert numeric strings to int or float, other values are returned as is.
+
+    Examples:
+    >>> safe_numeric('1'), safe_numeric('1.5'), safe_numeric('1e3')
+    (1, 1.5, 1000.0)
+    >>> safe_numeric('adam'), safe_numeric('1a')
+    ('adam', '1a')
+    """
     if isinstance(value, str):
-        try:
-            return int(value)
-        except:
-            pass
-        try:
-            return float(value)
-        except:
-            pass
+        if _INT_PATTERN.fullmatch(value):
+            try:
+                return int(value)
+            except ValueError:
+                pass
+        if _FLOAT_PREFIX.match(value):
+            try:
+                return float(value)
+            except ValueError:
+                pass
     return value
 
 
@@ -404,7 +489,10 @@ if __name__ == "__main__":
     import doctest
     doctest.testmod(verbose=False)
 
+    import copy
+    import pickle
     import unittest
+    import weakref
 
     class TestHyperParameter(unittest.TestCase):
 
@@ -443,6 +531,58 @@ if __name__ == "__main__":
             self.assertEqual(param1.a, 1)
             self.assertEqual(param1.b, 2)
 
+        def test_parameter_nested_patch(self):
+            param1 = HyperParameter(a={'b': {'c': 1}})
+            old_a = param1.a
+            param1.update({'a': {'b': {'d': 2}}, 'e': {'f': 3}})
+            self.assertDictEqual(param1, {
+                'a': {
+                    'b': {
+                        'c': 1,
+                        'd': 2
+                    }
+                },
+                'e': {
+                    'f': 3
+                }
+            })
+            self.assertIsInstance(param1.a.b, HyperParameter)
+            self.assertDictEqual(old_a, {'b': {'c': 1}})
+
+        def test_weakref(self):
+            param1 = HyperParameter(a=1)
+            self.assertIs(weakref.ref(param1)(), param1)
+            with param_scope(a=1) as hp:
+                self.assertIs(weakref.ref(hp)(), hp)
+            accessor = param1().x.y
+            self.assertIs(weakref.ref(accessor)(), accessor)
+
+    class TestSafeNumeric(unittest.TestCase):
+
+        def test_numeric_strings(self):
+            self.assertEqual(safe_numeric(' 12 '), 12)
+            self.assertEqual(safe_numeric('1_000'), 1000)
+            self.assertEqual(safe_numeric('-1E-3'), -0.001)
+            self.assertEqual(safe_numeric('inf'), float('inf'))
+            self.assertEqual(safe_numeric('information'), 'information')
+
+        def test_int_size_limit(self):
+            # the result depends on the interpreter's int digit limit, so
+            # compare with plain int/float conversion instead of a constant
+            value = '1' * 5000
+            try:
+                expected = int(value)
+            except ValueError:
+                expected = float(value)
+            self.assertEqual(safe_numeric(value), expected)
+            with param_scope('a=' + value) as hp:
+                self.assertEqual(hp.a, expected)
+
+        def test_non_ascii_whitespace(self):
+            self.assertEqual(safe_numeric('7\x1c'), '7\x1c')
+            self.assertEqual(safe_numeric('\x1c5'), '\x1c5')
+            self.assertEqual(_parse_define('a=7\x1c'), ('a', '7\x1c'))
+
     class TestHolder(unittest.TestCase):
 
         def test_holder_as_bool(self):
@@ -455,6 +595,78 @@ if __name__ == "__main__":
             param1.a.b = True
             self.assertTrue(param1.a.b)
 
+        def test_holder_with_deep_path(self):
+            param1 = HyperParameter(a={'b': {'c': 1}})
+            self.assertEqual(param1().a.b.c(2), 1)
+            self.assertEqual(param1().a.b.d(2), 2)
+
+            param1().x.y.z = 3
+            self.assertEqual(param1.get('x.y.z'), 3)
+
+            param1().a.b.d = 4
+            self.assertDictEqual(param1.a, {'b': {'c': 1, 'd': 4}})
+            self.assertIn('x.y.z', Tracker.writes())
+
+    class TestTracker(unittest.TestCase):
+
+        def test_tracker_report(self):
+            param1 = HyperParameter()
+            param1.put('report.b', 1)
+            param1.put('report.a', 1)
+            param1.get('report.c')
+            writes = Tracker.writes()
+            self.assertLess(writes.index('report.a'), writes.index('report.b'))
+            self.assertIn('report.c', Tracker.reads())
+            self.assertIn('report.c', Tracker.all())
+
+            param1.put('report.d', 1)
+            self.assertIn('report.d', Tracker.writes())
+            self.assertIn('  report.d', Tracker.report())
+
+        def test_tracker_after_reset(self):
+            rlist = Tracker.rlist
+            try:
+                Tracker.rlist = set()
+                Tracker.rlist.add('a')
+                self.assertEqual(Tracker.reads(), ['a'])
+                Tracker.rlist.discard('a')
+                Tracker.rlist.add('b')
+                self.assertEqual(Tracker.reads(), ['b'])
+                Tracker.rlist = {'zzz'}
+                self.assertEqual(Tracker.reads(), ['zzz'])
+                self.assertIn('zzz', Tracker.all())
+            finally:
+                Tracker.rlist = rlist
+
+        def test_tracker_disabled(self):
+            param1 = HyperParameter()
+            Tracker.enabled = False
+            try:
+                param1.put('untracked.a', 1)
+                param1.get('untracked.a')
+            finally:
+                Tracker.enabled = True
+            self.assertNotIn('untracked.a', Tracker.all())
+
+            param1.put('tracked.a', 1)
+            self.assertIn('tracked.a', Tracker.writes())
+
+    class TestAccessor(unittest.TestCase):
+
+        def test_accessor_copy_and_pickle(self):
+            param1 = HyperParameter(x={'y': 1})
+            accessors = [param1().x.y, param1().x.z]
+            for accessor in accessors:
+                for clone in [
+                        copy.copy(accessor),
+                        pickle.loads(pickle.dumps(accessor))
+                ]:
+                    self.assertIsInstance(clone, Accessor)
+                    self.assertEqual(clone._path, accessor._path)
+                    self.assertDictEqual(clone._root, param1)
+            self.assertEqual(copy.copy(accessors[0])(2), 1)
+            self.assertEqual(copy.copy(accessors[1])(2), 2)
+
     class TestParamScope(unittest.TestCase):
 
         def test_scope_create(self):
@@ -473,6 +685,25 @@ if __name__ == "__main__":
                 with param_scope(a=3) as hp2:
                     self.assertEqual(hp2.a, 3)
 
+        def test_nested_scope_isolation(self):
+            with param_scope(**{'a': {'b': {'c': 1}}}) as hp1:
+                with param_scope('a.b.d=2') as hp2:
+                    hp2.a.b.c = 3
+                    self.assertEqual(hp2.a.b.c, 3)
+                    self.assertEqual(hp2.a.b.d, 2)
+                self.assertDictEqual(hp1, {'a': {'b': {'c': 1}}})
+
+        def test_scope_with_defines(self):
+            with param_scope('a=1', 'b.c=2.5', 'd=str') as hp:
+                self.assertEqual(hp.a, 1)
+                self.assertEqual(hp.b.c, 2.5)
+                self.assertEqual(hp.d, 'str')
+
+        def test_scope_ignores_non_string_args(self):
+            with param_scope(['a=1'], {'a': 1}, 'b=2') as hp:
+                self.assertFalse(hp.a)
+                self.assertEqual(hp.b, 2)
+
         def test_scope_with_function_call(self):
 
             def read_a():
@@ -492,4 +723,50 @@ if __name__ == "__main__":
                     self.assertEqual(read_a(), 2)
                 self.assertEqual(read_a(), 1)
 
+    class TestParamScopeThreads(unittest.TestCase):
+
+        def test_scope_in_new_thread(self):
+            results = []
+
+            def read_a():
+                with param_scope() as hp:
+                    results.append(hp().a(0))
+                param_scope.init(HyperParameter(a=2))
+                with param_scope() as hp:
+                    results.append(hp().a(0))
+
+            with param_scope(a=1):
+                t = threading.Thread(target=read_a)
+                t.start()
+                t.join()
+            self.assertEqual(results, [0, 2])
+
+    class TestAutoParam(unittest.TestCase):
+
+        def test_auto_param_with_scope(self):
+
+            @auto_param
+            def foo(a, b=1, c=2):
+                return a, b, c
+
+            self.assertEqual(foo(0), (0, 1, 2))
+            with param_scope('foo.b=3'):
+                self.assertEqual(foo(0), (0, 3, 2))
+                self.assertEqual(foo(0, b=4), (0, 4, 2))
+
+        def test_auto_param_callback(self):
+
+            @auto_param
+            def foo(b=1, c=2):
+                return b, c
+
+            reported = []
+            Tracker.set_tracker(reported.append)
+            try:
+                with param_scope('foo.c=3'):
+                    foo()
+            finally:
+                Tracker.set_tracker(None)
+            self.assertDictEqual(reported[0], {'foo.b': 1, 'foo.c': 3})
+
     unittest.main()